@@ -0,0 +1,81 @@
+import sys, csv
+from itertools import islice
+
+RED = "\x1b[31m"
+GREEN = "\x1b[32m"
+YELLOW = "\x1b[33m"
+RESET = "\x1b[m"
+
+
+def check_did_optimize(baseline, new, name, allow_slower):
+    if new > baseline:
+        print(f"> {RED}{name} SLOWER ({name}: {new}, baseline: {baseline}){RESET}")
+        if not allow_slower:
+            sys.exit(1)
+    elif new < baseline:
+        print(f"> {GREEN}{name} FASTER ({name}: {new}, baseline: {baseline}){RESET}")
+    else:
+        print(f"> {YELLOW}{name} NOP ({name}: {new}, baseline: {baseline}){RESET}")
+
+
+def main(labels, argv=None):
+    """Checks brench CSV from stdin where every benchmark contributes a
+    baseline row followed by one row per label, in order."""
+    if argv is None:
+        argv = sys.argv[1:]
+    allow_slower = "--allow-slower" in argv
+
+    reader = csv.reader(sys.stdin)
+    next(reader)  # header
+
+    stride = 1 + len(labels)
+    # stream one benchmark group at a time instead of holding the whole CSV
+    while True:
+        group = list(islice(reader, stride))
+        if not group:
+            break
+        if len(group) != stride:
+            print(
+                f"{RED}{group[0][0]} TRUNCATED "
+                f"(expected {stride} rows per benchmark, got {len(group)}){RESET}"
+            )
+            sys.exit(1)
+        baseline = group[0]
+        runs = group[1:]
+
+        for status, message in (
+            ("incorrect", "INCORRECT"),
+            ("timeout", "TIMED OUT"),
+            ("missing", "MISSING"),
+        ):
+            if any(run[2] == status for run in runs):
+                print(f"{RED}{baseline[0]} {message}{RESET}")
+                sys.exit(1)
+
+        baseline_time = int(baseline[2])
+        times = [int(run[2]) for run in runs]
+
+        print(f"{baseline[0]}")
+        for label, time in zip(labels, times):
+            check_did_optimize(baseline_time, time, label, allow_slower)
+        # sort a tuple directly instead of building and concatenating lists
+        times_scored = sorted(((baseline_time, "baseline"), *zip(times, labels)))
+        print(f"  (times in order: {times_scored})")
+
+
+if __name__ == "__main__":
+    labels = None
+    rest = []
+    next_is_labels = False
+    for arg in sys.argv[1:]:
+        if next_is_labels:
+            labels = arg.split(",")
+            next_is_labels = False
+        elif arg == "--labels":
+            next_is_labels = True
+        else:
+            rest.append(arg)
+    if labels is None:
+        print("usage: python3 check_brench.py --labels a,b,c [--allow-slower]")
+        sys.exit(1)
+    main(labels, rest)
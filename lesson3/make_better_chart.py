@@ -1,13 +1,15 @@
 import sys, csv
+from itertools import islice
 
-rows = list(csv.reader(sys.stdin))
+reader = csv.reader(sys.stdin)
+next(reader)  # header
 
-print("benchmark,baseline,tdce,lvn,lvn_tdce")
+writer = csv.writer(sys.stdout, lineterminator="\n")
+writer.writerow(["benchmark", "baseline", "tdce", "lvn", "lvn_tdce"])
 
-for i in range(1, len(rows), 4):
-    name = rows[i][0]
-    baseline = rows[i][2]
-    tdce = rows[i + 1][2]
-    lvn = rows[i + 2][2]
-    lvn_tdce = rows[i + 3][2]
-    print(f"{name},{baseline},{tdce},{lvn},{lvn_tdce}")
+# stream one benchmark group at a time instead of holding the whole CSV
+while True:
+    group = list(islice(reader, 4))
+    if not group:
+        break
+    writer.writerow([group[0][0], group[0][2], group[1][2], group[2][2], group[3][2]])
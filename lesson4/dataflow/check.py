@@ -1,28 +1,47 @@
-import sys, subprocess
+import sys, os, subprocess
 import multiprocessing
+import concurrent.futures
 
-
-def init_worker(shared_failure_event):
-    global failure_event
-    failure_event = shared_failure_event
+DATAFLOW_BINARY = os.path.join(
+    os.path.dirname(__file__), "..", "..", "target", "debug", "dataflow"
+)
 
 
 def check_file(args):
     (file, analysis) = args
     print(f"\x1b[33m{file} START\x1b[m")
-    result = subprocess.run(
-        f"bril2json <{file} | cargo run --package dataflow --quiet -- --analysis {analysis}",
-        shell=True,
-        capture_output=True,
+    # no shell=True: spawning the stages directly skips /bin/sh and lets
+    # CPython use its posix_spawn fast path
+    with open(file, "rb") as f:
+        bril2json_process = subprocess.Popen(
+            ["bril2json"], stdin=f, stdout=subprocess.PIPE
+        )
+    analysis_process = subprocess.Popen(
+        [DATAFLOW_BINARY, "--analysis", analysis],
+        stdin=bril2json_process.stdout,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
     )
-    if result.returncode == 0:
+    bril2json_process.stdout.close()
+    (_, stderr) = analysis_process.communicate()
+    if analysis_process.returncode == 0:
         print(f"\x1b[32m{file} OK\x1b[m")
+        return True
     else:
         print(f"\x1b[31m{file} ERROR\x1b[m")
         print("---")
-        print(result.stderr.decode("utf-8"))
+        print(stderr.decode("utf-8"))
         print("---")
-        failure_event.set()
+        return False
+
+
+def check_batch(args):
+    (files, analysis) = args
+    ok = True
+    for file in files:
+        if not check_file((file, analysis)):
+            ok = False
+    return ok
 
 
 if __name__ == "__main__":
@@ -32,18 +51,31 @@ if __name__ == "__main__":
     analysis = sys.argv[1]
     files = sys.argv[2:]
 
-    with multiprocessing.Manager() as manager:
-        failure_event = manager.Event()
-
-        with multiprocessing.Pool(
-            multiprocessing.cpu_count(),
-            initializer=init_worker,
-            initargs=(failure_event,),
-        ) as pool:
-            pool.imap_unordered(check_file, [(file, analysis) for file in files])
-            pool.close()
-            pool.join()
-            if failure_event.is_set():
+    # build once up front so workers run the binary directly instead of
+    # going through cargo (and its target-dir lock) per file
+    print("Rebuilding dataflow")
+    subprocess.run(
+        ["cargo", "build", "--package", "dataflow", "--quiet"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+    )
+
+    # amortize dispatch/pickling overhead over several files per task
+    batch_size = max(1, len(files) // (4 * multiprocessing.cpu_count()))
+
+    batches = [files[i : i + batch_size] for i in range(0, len(files), batch_size)]
+
+    # cancel outstanding batches as soon as one fails instead of grinding
+    # through every remaining file
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=multiprocessing.cpu_count(),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as executor:
+        futures = [executor.submit(check_batch, (batch, analysis)) for batch in batches]
+        for future in concurrent.futures.as_completed(futures):
+            if not future.result():
+                for other in futures:
+                    other.cancel()
+                executor.shutdown(cancel_futures=True)
                 print("Exiting due to errors")
-                pool.terminate()
                 sys.exit(1)
@@ -22,8 +22,10 @@ def parse_args():
     args = sys.argv[3:]
     filenames = []
     exclude = []
+    batch_size = None
     all_are_args = False
     next_is_exclude = False
+    next_is_batch_size = False
     for arg in args:
         if all_are_args:
             filenames.append(arg)
@@ -31,10 +33,15 @@ def parse_args():
             all_are_args = True
         elif arg == "--exclude":
             next_is_exclude = True
+        elif arg == "--batch-size":
+            next_is_batch_size = True
         else:
             if next_is_exclude:
                 exclude.append(arg)
                 next_is_exclude = False
+            elif next_is_batch_size:
+                batch_size = int(arg)
+                next_is_batch_size = False
             else:
                 filenames.append(arg)
     return (
@@ -45,74 +52,112 @@ def parse_args():
             for filename in filenames
             if not any(isinstance(e, str) and filename.endswith(e) for e in exclude)
         ],
+        batch_size,
     )
 
 
-def init_worker(shared_failure_event, shared_oracle, shared_tested):
-    global failure_event
+# don't stall the pool rendering O(N*M) ndiffs; a few are plenty to debug
+MAX_RENDERED_DIFFS = 5
+
+
+def init_worker(shared_oracle, shared_tested):
     global oracle
     global tested
-    failure_event = shared_failure_event
     oracle = shared_oracle
     tested = shared_tested
 
+# precompiled %-templates: cheaper than re-running an f-string per diff line
+RED = "\033[38;2;255;0;0m%s\033[m"
+GREEN = "\033[38;2;0;255;0m%s\033[m"
+BLUE = "\033[38;2;0;0;255m%s\033[m"
+WHITE = "\033[38;2;255;255;255m%s\033[m"
+GRAY = "\033[38;2;128;128;128m%s\033[m"
+
+
+def run_pipeline(file, cmd):
+    # spawn bril2json directly, but keep the shell for cmd: callers pass
+    # whole pipelines like "... | grep in:" that shlex.split would mangle;
+    # raw bytes come back with stderr merged like getoutput did
+    with open(file, "rb") as f:
+        bril2json_process = subprocess.Popen(
+            ["bril2json"], stdin=f, stdout=subprocess.PIPE
+        )
+    cmd_process = subprocess.Popen(
+        cmd,
+        shell=True,
+        stdin=bril2json_process.stdout,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    bril2json_process.stdout.close()
+    return cmd_process.communicate()[0]
+
 
 def check_file(file):
     args = extract_args(file)
     if args == None:
         args = ""
 
-    oracle_output = subprocess.getoutput(
-        f"bril2json <{file} | {oracle}".replace("{args}", args)
-    )
-    my_output = subprocess.getoutput(
-        f"bril2json <{file} | {tested}".replace("{args}", args)
-    )
-    if oracle_output == my_output:
-        print(f"\x1b[32m{file} OK\x1b[m")
+    oracle_bytes = run_pipeline(file, oracle.replace("{args}", args))
+    my_bytes = run_pipeline(file, tested.replace("{args}", args))
+    if oracle_bytes == my_bytes:
+        return ("OK", file)
     else:
-        print(f"\x1b[31m{file} ERROR\x1b[m")
-        failure_event.set()
-
-        red = lambda text: f"\033[38;2;255;0;0m{text}\033[m"
-        green = lambda text: f"\033[38;2;0;255;0m{text}\033[m"
-        blue = lambda text: f"\033[38;2;0;0;255m{text}\033[m"
-        white = lambda text: f"\033[38;2;255;255;255m{text}\033[m"
-        gray = lambda text: f"\033[38;2;128;128;128m{text}\033[m"
-
-        diff = difflib.ndiff(oracle_output.splitlines(), my_output.splitlines())
-        print("--- DIFF ---")
-        for line in diff:
-            if line.startswith("+"):
-                print(green(line))
-            elif line.startswith("-"):
-                print(red(line))
-            elif line.startswith("^"):
-                print(blue(line))
-            elif line.startswith("?"):
-                print(gray(line))
-            else:
-                print(white(line))
+        return ("ERROR", file, oracle_bytes, my_bytes)
+
+
+def render_diff(oracle_output, my_output):
+    diff = difflib.ndiff(oracle_output.splitlines(), my_output.splitlines())
+    lines = ["--- DIFF ---"]
+    for line in diff:
+        if line.startswith("+"):
+            lines.append(GREEN % line)
+        elif line.startswith("-"):
+            lines.append(RED % line)
+        elif line.startswith("^"):
+            lines.append(BLUE % line)
+        elif line.startswith("?"):
+            lines.append(GRAY % line)
+        else:
+            lines.append(WHITE % line)
+    # one write instead of a flushed print per line
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("usage: python3 test.py <oracle> <tested> <file>...")
         sys.exit(1)
-    (oracle, tested, files) = parse_args()
-
-    with multiprocessing.Manager() as manager:
-        failure_event = manager.Event()
-
-        with multiprocessing.Pool(
-            multiprocessing.cpu_count(),
-            initializer=init_worker,
-            initargs=(failure_event, oracle, tested),
-        ) as pool:
-            pool.imap_unordered(check_file, files)
-            pool.close()
-            pool.join()
-            if failure_event.is_set():
-                print("Exiting due to errors")
-                pool.terminate()
-                sys.exit(1)
+    (oracle, tested, files, batch_size) = parse_args()
+    if batch_size is None:
+        # amortize dispatch/pickling overhead over several files per task
+        batch_size = max(1, len(files) // (4 * multiprocessing.cpu_count()))
+
+    # fork is cheaper than spawn where it's not already the default, but
+    # it's purely an optimization: oracle/tested still travel through
+    # initargs so the script works under any start method
+    multiprocessing.set_start_method("fork", force=True)
+
+    with multiprocessing.Pool(
+        multiprocessing.cpu_count(),
+        initializer=init_worker,
+        initargs=(oracle, tested),
+    ) as pool:
+        failed = False
+        rendered_diffs = 0
+        # render diffs here in the parent so workers keep crunching files
+        for result in pool.imap_unordered(check_file, files, chunksize=batch_size):
+            if result[0] == "OK":
+                print(f"\x1b[32m{result[1]} OK\x1b[m")
+            else:
+                (_, file, oracle_bytes, my_bytes) = result
+                print(f"\x1b[31m{file} ERROR\x1b[m")
+                failed = True
+                if rendered_diffs < MAX_RENDERED_DIFFS:
+                    rendered_diffs += 1
+                    render_diff(
+                        oracle_bytes.decode("utf-8"), my_bytes.decode("utf-8")
+                    )
+        if failed:
+            print("Exiting due to errors")
+            sys.exit(1)